@@ -0,0 +1,309 @@
+"""Benchmark suite and regression harness for the Hyper-Geometrisomorphous engine.
+
+Run the suite and store its results:
+    python benchmark.py run --output results.json
+
+Compare a fresh run against a stored baseline (exits non-zero on a regression):
+    python benchmark.py run --baseline baseline.json
+    python benchmark.py compare baseline.json results.json --tolerance 0.25
+
+Check that every fast path still produces the codex of the reference search
+(exits non-zero on any difference):
+    python benchmark.py verify
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import engine
+from engine import (BinaryCodex, EncodingSession, HyperGeometrisomorphous, HyperGeometrisomorphousDecoder,
+                    PATH_ENGINES, PhaseStats, StreamingCodex)
+
+PHASES = ('enumerate', 'index', 'projection', 'tours', 'encode', 'blueprint')
+
+# --- Synthetic Corpora ---
+# Each case varies one axis: length, alphabet size, periodicity, or how many
+# divisors the length has (a prime length has a single volume, a highly
+# composite one has hundreds).
+CASES = [
+    {'name': 'prose-1k', 'length': 1008, 'alphabet': 27, 'period': 0, 'noise': 0.0},
+    {'name': 'prose-5k', 'length': 5040, 'alphabet': 27, 'period': 0, 'noise': 0.0},
+    {'name': 'binary-5k', 'length': 5040, 'alphabet': 2, 'period': 0, 'noise': 0.0},
+    {'name': 'unicode-5k', 'length': 5040, 'alphabet': 400, 'period': 0, 'noise': 0.0},
+    {'name': 'periodic-5k', 'length': 5040, 'alphabet': 12, 'period': 60, 'noise': 0.02},
+    {'name': 'prime-5k', 'length': 5039, 'alphabet': 27, 'period': 0, 'noise': 0.0},
+    {'name': 'composite-20k', 'length': 20160, 'alphabet': 27, 'period': 0, 'noise': 0.0},
+]
+QUICK_CASES = ('prose-1k', 'periodic-5k', 'prime-5k')
+
+
+def make_corpus(length, alphabet, period=0, noise=0.0, seed=0):
+    """Builds a reproducible text: uniform noise, or a repeated pattern with a fraction of substitutions."""
+    rng = random.Random(seed)
+    symbols = [chr(ord('a') + i) if i < 26 else chr(0x3b1 + i - 26) for i in range(alphabet)]
+    if period:
+        pattern = [rng.choice(symbols) for _ in range(period)]
+        chars = [pattern[i % period] for i in range(length)]
+        for i in rng.sample(range(length), int(length * noise)):
+            chars[i] = rng.choice(symbols)
+    else:
+        chars = [rng.choice(symbols) for _ in range(length)]
+    return "".join(chars)
+
+
+# --- Measurement ---
+def measure_phases(text):
+    """Times one production analysis, pruning included, phase by phase through the engine's own hooks.
+
+    Returns the timings and the number of tours started.
+    """
+    engine._volume_permutations.cache_clear()
+    stats = PhaseStats()
+    start = time.perf_counter()
+    HyperGeometrisomorphous(text, metrics=stats).generate_blueprint()
+    elapsed = time.perf_counter() - start
+    recorded = stats.as_dict()
+    timings = {phase: recorded['seconds'].get(phase, 0.0) for phase in PHASES}
+    timings['blueprint'] = elapsed
+    return timings, recorded['counts'].get('permutations_evaluated', 0)
+
+
+def measure_peak_memory(text):
+    """Peak bytes allocated by Python and NumPy during one full analysis."""
+    engine._volume_permutations.cache_clear()
+    tracemalloc.start()
+    try:
+        HyperGeometrisomorphous(text).generate_blueprint()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(cases, repeat=3, seed=0, log=print):
+    results = {}
+    for case in cases:
+        text = make_corpus(case['length'], case['alphabet'], case['period'], case['noise'], seed)
+        best = dict.fromkeys(PHASES, float('inf'))
+        for _ in range(repeat):
+            timings, tours = measure_phases(text)
+            best = {phase: min(best[phase], timings[phase]) for phase in PHASES}
+        peak = measure_peak_memory(text)
+        results[case['name']] = {
+            'case': case,
+            'phases': best,
+            'tours': tours,
+            'throughput_cps': len(text) / best['blueprint'] if best['blueprint'] else None,
+            'peak_bytes': peak,
+        }
+        log(f"{case['name']:>14}  blueprint {best['blueprint']:8.3f}s  "
+            f"{results[case['name']]['throughput_cps']:10.0f} chars/s  peak {peak / 1e6:7.2f} MB")
+    return {
+        'version': 1,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'seed': seed,
+        'repeat': repeat,
+        'cases': results,
+    }
+
+
+# --- Regression Comparison ---
+def compare(baseline, current, tolerance=0.25, memory_tolerance=0.25, min_seconds=0.005):
+    """Lists every phase time or peak memory that grew beyond its tolerance over the baseline,
+    and every baseline case the current run lacks.
+
+    Differences below `min_seconds` are ignored, so timer noise on tiny phases cannot fail a run.
+    """
+    regressions = []
+    for name, base in baseline['cases'].items():
+        now = current['cases'].get(name)
+        if now is None:
+            regressions.append(f"{name}: missing from the current run")
+            continue
+        for phase in PHASES:
+            if phase not in base['phases']: continue
+            before, after = base['phases'][phase], now['phases'][phase]
+            if after > before * (1 + tolerance) and after - before > min_seconds:
+                regressions.append(f"{name}: {phase} {before:.4f}s -> {after:.4f}s (+{(after / before - 1) * 100:.0f}%)")
+        before, after = base['peak_bytes'], now['peak_bytes']
+        if after > before * (1 + memory_tolerance):
+            regressions.append(f"{name}: peak memory {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB")
+    return regressions
+
+
+# --- Compatibility Checks ---
+# Small corpora, so the unpruned reference search stays quick. Between them they cover a
+# prime length, highly composite ones, a two-letter alphabet and a periodic text.
+VERIFY_CASES = [
+    {'length': 360, 'alphabet': 27, 'period': 0, 'noise': 0.0},
+    {'length': 719, 'alphabet': 12, 'period': 0, 'noise': 0.0},
+    {'length': 720, 'alphabet': 2, 'period': 0, 'noise': 0.0},
+    {'length': 840, 'alphabet': 12, 'period': 24, 'noise': 0.05},
+    {'length': 1008, 'alphabet': 40, 'period': 0, 'noise': 0.0},
+]
+# Characters that double as codex separators must survive every format.
+VERIFY_TEXTS = ["§|§|ab", "a", "len:3§x|1x1x3|S0,0,0\n" * 7]
+
+
+def reference_tour(points):
+    """The original greedy walk: from the first point, always to the nearest remaining one,
+    the earliest on a tie. Returns the visiting order."""
+    points = np.asarray(points, dtype=np.float64)
+    order, remaining = [0], np.arange(1, len(points))
+    while len(remaining):
+        nearest = int(np.argmin(np.linalg.norm(points[remaining] - points[order[-1]], axis=1)))
+        order.append(int(remaining[nearest]))
+        remaining = np.delete(remaining, nearest)
+    return order
+
+
+def reference_winner(analyzer, char, volumes):
+    """Tours and encodes every volume without pruning; the shortest description wins, the earliest on a tie."""
+    best = None
+    for dims, points in zip(volumes, analyzer._project_positions(analyzer.positions[char], volumes)):
+        desc = analyzer._encode_path(analyzer._find_shortest_path(points))
+        if best is None or len(desc) < best['desc_len']:
+            best = {'dims': dims, 'desc_len': len(desc), 'desc': desc}
+    return best
+
+
+def verify_tours(seed, clouds=24):
+    """Every path engine against the reference walk, on clouds dense enough to force distance ties."""
+    rng = np.random.default_rng(seed)
+    failures = []
+    for cloud in range(clouds):
+        n, extent = int(rng.integers(1, 700)), int(rng.integers(2, 40))
+        points = rng.integers(0, extent, size=(n, 3)).astype(np.int32)
+        expected = points[reference_tour(points)]
+        for name, engine_class in sorted(PATH_ENGINES.items()):
+            if not np.array_equal(engine_class()(points), expected):
+                failures.append(f"tour: {name} engine differs from the reference walk on cloud {cloud} ({n} points)")
+    return failures
+
+
+def verify_text(label, text, workers):
+    """Pruned search, parallel search and both codex formats against the reference for one text."""
+    failures = []
+    analyzer = HyperGeometrisomorphous(text)
+    lattice = analyzer._get_volume_permutations()
+    for char in sorted(analyzer.positions):
+        volumes = analyzer._candidate_volumes(char, lattice)
+        if analyzer.find_best_algorithm_for_char(char, volumes) != reference_winner(analyzer, char, volumes):
+            failures.append(f"{label}: branch and bound picks another winner for {char!r}")
+        path = analyzer._find_shortest_path(analyzer._project_positions(analyzer.positions[char], volumes[:1])[0])
+        if analyzer._description_length(path) != len(analyzer._encode_path(path)):
+            failures.append(f"{label}: description length of {char!r} disagrees with its encoding")
+    serial = HyperGeometrisomorphous(text).generate_blueprint()
+    if workers > 1 and HyperGeometrisomorphous(text).generate_blueprint(workers=workers) != serial:
+        failures.append(f"{label}: workers={workers} codex differs from the serial one")
+    if HyperGeometrisomorphousDecoder(serial['serialized_codex']).decode() != text:
+        failures.append(f"{label}: serialized codex does not decode to the text")
+    if BinaryCodex.decode(BinaryCodex.encode(serial['codex'])) != text:
+        failures.append(f"{label}: binary codex does not decode to the text")
+    return failures
+
+
+def verify_session(label, text, seed, edits=12, block_size=128):
+    """Seeded appends and splices: every block must match a fresh blueprint and the container the text."""
+    rng = random.Random(seed)
+    session = EncodingSession(text[:len(text) // 2], block_size=block_size)
+    expected = session.text
+    for _ in range(edits):
+        insert = "".join(rng.choice(text) for _ in range(rng.randint(0, 40))) if text else ""
+        if rng.random() < 0.5:
+            session.append(insert)
+            expected += insert
+        else:
+            start = rng.randint(0, len(expected))
+            end = min(len(expected), start + rng.randint(0, 60))
+            session.splice(start, end, insert)
+            expected = expected[:start] + insert + expected[end:]
+        blocks = [block['text'] for block in session._blocks]
+        if session.blueprints() != [HyperGeometrisomorphous(block).generate_blueprint() for block in blocks]:
+            return [f"{label}: a session block differs from a fresh blueprint of its text"]
+        if "".join(StreamingCodex.decode_blocks(session.container())) != expected:
+            return [f"{label}: session container does not decode to the edited text"]
+    return []
+
+
+def run_verify(seed=0, workers=2, log=print):
+    failures = verify_tours(seed)
+    texts = [(f"case-{case['length']}-{case['alphabet']}", make_corpus(case['length'], case['alphabet'], case['period'], case['noise'], seed))
+             for case in VERIFY_CASES]
+    texts += [(f"text-{i}", text) for i, text in enumerate(VERIFY_TEXTS)]
+    for label, text in texts:
+        failures += verify_text(label, text, workers)
+        failures += verify_session(label, text, seed)
+        log(f"{label:>16}  checked")
+    return failures
+
+
+def _report(regressions):
+    if regressions:
+        print("Performance regressions:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("No regressions against the baseline.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Hyper-Geometrisomorphous engine.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Run the suite.")
+    run.add_argument('--output', help="Write results as JSON to this path.")
+    run.add_argument('--baseline', help="Compare the results against this stored run.")
+    run.add_argument('--quick', action='store_true', help="Only run the small cases.")
+    run.add_argument('--case', action='append', help="Run only the named case (repeatable).")
+    run.add_argument('--repeat', type=int, default=3, help="Runs per case; the fastest is kept.")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--tolerance', type=float, default=0.25)
+    run.add_argument('--memory-tolerance', type=float, default=0.25)
+
+    comp = commands.add_parser('compare', help="Compare two stored runs.")
+    comp.add_argument('baseline')
+    comp.add_argument('current')
+    comp.add_argument('--tolerance', type=float, default=0.25)
+    comp.add_argument('--memory-tolerance', type=float, default=0.25)
+
+    check = commands.add_parser('verify', help="Check the fast paths against the reference search.")
+    check.add_argument('--seed', type=int, default=0)
+    check.add_argument('--workers', type=int, default=2, help="Pool size for the parallel comparison; 1 skips it.")
+
+    args = parser.parse_args(argv)
+    if args.command == 'verify':
+        failures = run_verify(seed=args.seed, workers=args.workers)
+        for line in failures:
+            print(f"  - {line}")
+        print(f"{len(failures)} compatibility failures." if failures else "Every fast path matches the reference.")
+        return 1 if failures else 0
+    if args.command == 'compare':
+        with open(args.baseline) as handle: baseline = json.load(handle)
+        with open(args.current) as handle: current = json.load(handle)
+        return _report(compare(baseline, current, args.tolerance, args.memory_tolerance))
+
+    cases = CASES
+    if args.quick: cases = [case for case in cases if case['name'] in QUICK_CASES]
+    if args.case: cases = [case for case in cases if case['name'] in args.case]
+    results = run_suite(cases, repeat=args.repeat, seed=args.seed)
+    if args.output:
+        with open(args.output, 'w') as handle: json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle: baseline = json.load(handle)
+        # A filtered run is only held to the cases it was asked to run.
+        selected = {case['name'] for case in cases}
+        baseline['cases'] = {name: case for name, case in baseline['cases'].items() if name in selected}
+        return _report(compare(baseline, results, args.tolerance, args.memory_tolerance))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
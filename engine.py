@@ -0,0 +1,1211 @@
+"""The Hyper-Geometrisomorphous engine, decoders and codex formats, without the web server.
+
+Importing this module has no side effects and loads nothing beyond the standard
+library; NumPy is imported on first use. It is also a small command-line tool:
+
+    python engine.py compress notes.txt -o notes.hgc
+    python engine.py decompress notes.hgc
+    cat big.log | python engine.py compress --format stream > big.hgs
+"""
+import sys
+import os
+import math
+import re
+import atexit
+import codecs
+import importlib
+import io
+import mmap
+import struct
+import functools
+import time
+from threading import Lock
+from collections import deque
+
+
+# --- Lazy NumPy ---
+class _LazyNumpy:
+    """Stands in for the numpy module until first use, then rebinds `np` to the real thing."""
+
+    def __getattr__(self, name):
+        global np
+        np = importlib.import_module('numpy')
+        return getattr(np, name)
+
+
+np = _LazyNumpy()
+
+# --- Path Engines: Nearest-Neighbour Tours ---
+class PathEngine:
+    """Greedy nearest-neighbour tour over an (n, 3) integer constellation.
+
+    The tour starts at the first point and always walks to the closest remaining
+    point, preferring the earliest one on a tie. Subclasses only decide how the
+    closest point is found; the walk itself must never differ between them.
+    """
+    name = "base"
+
+    def walk(self, points):
+        """Yields indices into `points` in visiting order, one step at a time.
+
+        Consumers may stop iterating early to abandon a tour they no longer need.
+        """
+        raise NotImplementedError
+
+    def tour(self, points):
+        """Returns the visiting order as an index array into `points`."""
+        return np.fromiter(self.walk(points), dtype=np.intp, count=len(points))
+
+    def __call__(self, points):
+        points = np.asarray(points, dtype=np.int32).reshape(-1, 3)
+        if len(points) == 0:
+            return points
+        return points[self.tour(points)]
+
+
+class VectorizedPathEngine(PathEngine):
+    """Scans every remaining point per step with one NumPy distance kernel."""
+    name = "vectorized"
+
+    def walk(self, points):
+        n = len(points)
+        # Remaining ids are kept in ascending order so argmin breaks ties the same way
+        # the original list-based walk did. Removal only flips a mask; the arrays are
+        # compacted once half of them is dead to keep the kernel proportional to the
+        # points still in play.
+        ids = np.arange(n, dtype=np.intp)
+        coords = points.astype(np.int64)
+        alive = np.ones(n, dtype=bool)
+        alive[0] = False
+        yield 0
+        current = coords[0]
+        live = n - 1
+        sentinel = np.iinfo(np.int64).max
+        for _ in range(1, n):
+            if live * 2 < len(ids):
+                ids, coords, alive = ids[alive], coords[alive], alive[alive]
+            delta = coords - current
+            d2 = np.einsum('ij,ij->i', delta, delta)
+            d2[~alive] = sentinel
+            nearest = int(np.argmin(d2))
+            alive[nearest] = False
+            live -= 1
+            yield int(ids[nearest])
+            current = coords[nearest]
+
+
+class GridPathEngine(PathEngine):
+    """Buckets the constellation into a uniform grid and searches outward in rings.
+
+    Each step only inspects the cells around the current point, so a tour costs
+    roughly O(n) cell visits when points are evenly spread. Once the ring to
+    scan holds more cells than there are points left, the step falls back to a
+    vectorized scan of the survivors.
+    """
+    name = "grid"
+
+    def walk(self, points):
+        n = len(points)
+        yield 0
+        if n == 1:
+            return
+        coords = points.astype(np.int64)
+        origin = coords.min(axis=0)
+        coords = coords - origin
+        extent = coords.max(axis=0) + 1
+        spread = [int(e) for e in extent if e > 1]
+        volume = math.prod(spread) if spread else 1
+        side = max(1, int(round((volume / n) ** (1.0 / max(1, len(spread))))))
+        cells_of = coords // side
+        bounds = tuple(int(b) for b in cells_of.max(axis=0))
+        cells = {}
+        for i, key in enumerate(map(tuple, cells_of.tolist())):
+            cells.setdefault(key, []).append(i)
+
+        alive = np.ones(n, dtype=bool)
+        tuples = coords.tolist()
+        keys = [tuple(k) for k in cells_of.tolist()]
+        cells[keys[0]].remove(0)
+        alive[0] = False
+        current = 0
+        live = n - 1
+        for _ in range(1, n):
+            nearest = self._ring_search(tuples, cells, keys[current], tuples[current], side, bounds, live)
+            if nearest is None:
+                survivors = np.flatnonzero(alive)
+                delta = coords[survivors] - coords[current]
+                nearest = int(survivors[np.argmin(np.einsum('ij,ij->i', delta, delta))])
+            cells[keys[nearest]].remove(nearest)
+            alive[nearest] = False
+            live -= 1
+            yield nearest
+            current = nearest
+
+    @staticmethod
+    def _ring_search(tuples, cells, centre, point, side, bounds, live):
+        cx, cy, cz = centre
+        px, py, pz = point
+        best_d2, best_id = None, None
+        r = 0
+        while True:
+            x_range = range(max(0, cx - r), min(bounds[0], cx + r) + 1)
+            y_range = range(max(0, cy - r), min(bounds[1], cy + r) + 1)
+            z_range = range(max(0, cz - r), min(bounds[2], cz + r) + 1)
+            if len(x_range) * len(y_range) * len(z_range) > 8 * live + 27:
+                return None
+            for x in x_range:
+                x_edge = abs(x - cx) == r
+                for y in y_range:
+                    if x_edge or abs(y - cy) == r:
+                        zs = z_range
+                    else:
+                        zs = [z for z in (cz - r, cz + r) if z in z_range]
+                    for z in zs:
+                        bucket = cells.get((x, y, z))
+                        if not bucket:
+                            continue
+                        for i in bucket:
+                            qx, qy, qz = tuples[i]
+                            d2 = (qx - px) ** 2 + (qy - py) ** 2 + (qz - pz) ** 2
+                            if best_d2 is None or d2 < best_d2 or (d2 == best_d2 and i < best_id):
+                                best_d2, best_id = d2, i
+            # Anything outside the first r rings is at least r * side + 1 away.
+            if best_d2 is not None and best_d2 < (r * side + 1) ** 2:
+                return best_id
+            if x_range.start == 0 and y_range.start == 0 and z_range.start == 0 and \
+                    x_range.stop > bounds[0] and y_range.stop > bounds[1] and z_range.stop > bounds[2]:
+                return best_id
+            r += 1
+
+
+class AutoPathEngine(PathEngine):
+    """Vectorized scans for small constellations, the grid index for large ones."""
+    name = "auto"
+    threshold = 256
+
+    def __init__(self):
+        self._small = VectorizedPathEngine()
+        self._large = GridPathEngine()
+
+    def walk(self, points):
+        engine = self._small if len(points) < self.threshold else self._large
+        return engine.walk(points)
+
+
+PATH_ENGINES = {engine.name: engine for engine in (VectorizedPathEngine, GridPathEngine, AutoPathEngine)}
+
+
+def get_path_engine(engine=None):
+    """Resolves a path engine from a registered name, an instance, or None for the default."""
+    if engine is None:
+        return AutoPathEngine()
+    if isinstance(engine, PathEngine):
+        return engine
+    try:
+        return PATH_ENGINES[engine]()
+    except KeyError:
+        raise ValueError(f"Unknown path engine '{engine}'. Expected one of: {', '.join(sorted(PATH_ENGINES))}.")
+
+
+# --- Instrumentation: Phase Timings ---
+class PhaseStats:
+    """Timings and counters for one analysis, filled in by an engine built with `metrics=PhaseStats()`.
+
+    Engines without one skip every clock read, so the hooks cost a None check when disabled.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.counts = {}
+
+    def add_time(self, phase, seconds):
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def merge(self, other):
+        """Folds in another analysis' stats, e.g. those returned by a pool worker."""
+        for phase, seconds in other['seconds'].items(): self.add_time(phase, seconds)
+        for name, n in other['counts'].items(): self.count(name, n)
+
+    def as_dict(self):
+        return {'seconds': dict(self.seconds), 'counts': dict(self.counts)}
+
+
+# --- Parallel Search: Persistent Process Pool ---
+_search_pool = None
+_search_pool_workers = 0
+_search_pool_lock = Lock()
+
+
+def get_search_pool(workers):
+    """Returns the shared process pool, rebuilding it only when the worker count changes."""
+    from concurrent.futures import ProcessPoolExecutor
+    global _search_pool, _search_pool_workers
+    with _search_pool_lock:
+        if _search_pool is None or _search_pool_workers != workers:
+            if _search_pool is not None:
+                _search_pool.shutdown(wait=True)
+            else:
+                atexit.register(shutdown_search_pool)
+            _search_pool = ProcessPoolExecutor(max_workers=workers)
+            _search_pool_workers = workers
+        return _search_pool
+
+
+def shutdown_search_pool():
+    global _search_pool, _search_pool_workers
+    with _search_pool_lock:
+        if _search_pool is not None:
+            _search_pool.shutdown(wait=True)
+        _search_pool, _search_pool_workers = None, 0
+
+
+def _search_job(shm_name, total, start, end, char, length, permutations, path_engine, collect_metrics=False):
+    """Worker side of the parallel search: scores one character against a slice of the permutations.
+
+    Returns the winner and, when asked, the worker's PhaseStats as a dict.
+    """
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        offsets = np.ndarray((total,), dtype=np.int64, buffer=shm.buf)[start:end].copy()
+    finally:
+        shm.close()
+    metrics = PhaseStats() if collect_metrics else None
+    engine = HyperGeometrisomorphous.from_positions(length, {char: offsets}, path_engine, metrics=metrics)
+    best = engine.find_best_algorithm_for_char(char, permutations)
+    return best, metrics.as_dict() if metrics else None
+
+
+# --- Engine Logic: Hyper-Geometrisomorphous ---
+# Bumped whenever a change alters the codex produced for some text, so stored
+# blueprints from an older engine are not mistaken for current ones.
+CODEX_VERSION = 2
+
+
+class AnalysisCancelled(Exception):
+    """Raised by generate_blueprint when its cancel event is set."""
+
+
+@functools.lru_cache(maxsize=None)
+def _powers_of_ten():
+    return np.array([10 ** k for k in range(19)], dtype=np.int64)
+
+
+def _prime_factors(n):
+    """Maps each prime factor of n to its exponent."""
+    factors = {}
+    divisor = 2
+    while divisor * divisor <= n:
+        while n % divisor == 0:
+            factors[divisor] = factors.get(divisor, 0) + 1
+            n //= divisor
+        divisor += 1 if divisor == 2 else 2
+    if n > 1: factors[n] = factors.get(n, 0) + 1
+    return factors
+
+
+@functools.lru_cache(maxsize=256)
+def _volume_permutations(length):
+    """Every unordered (pages, rows, cols) split of length, memoized per length.
+
+    The divisors come straight from the prime exponents, so no factorization is
+    missed; the splits are listed with pages <= rows <= cols, in lexicographic order.
+    """
+    if length < 1: return ((1, 1, length),)
+    divisors = [1]
+    for prime, exponent in _prime_factors(length).items():
+        divisors = [d * prime ** k for d in divisors for k in range(exponent + 1)]
+    divisors.sort()
+    volumes = []
+    for pages in divisors:
+        if pages ** 3 > length: break
+        area = length // pages
+        for rows in divisors:
+            if rows * rows > area: break
+            if rows >= pages and area % rows == 0:
+                volumes.append((pages, rows, area // rows))
+    return tuple(volumes)
+
+
+def gap_period_prior(lattice, indices):
+    """Scores volumes by how far their row or page stride sits from a character's dominant gap.
+
+    A stride equal to the gap turns every repeat into the same (0,1,0) or (1,0,0) step,
+    which the run-length encoding collapses. Lower is more promising.
+    """
+    gaps = np.diff(np.asarray(indices, dtype=np.int64))
+    if not len(gaps): return np.zeros(len(lattice))
+    values, counts = np.unique(gaps, return_counts=True)
+    period = float(values[np.argmax(counts)])
+    dims = np.asarray(lattice, dtype=np.float64).reshape(-1, 3)
+    return np.minimum(np.abs(np.log(dims[:, 2] / period)), np.abs(np.log(dims[:, 1] * dims[:, 2] / period)))
+
+
+def text_order_prior(lattice, indices, sample=256):
+    """Scores volumes by the description length of visiting the first `sample` occurrences in text order.
+
+    The greedy tour mostly follows text order, so this tracks the real cost closely while
+    touching only a sample; run counts are left out. Lower is more promising.
+    """
+    points = HyperGeometrisomorphous._project_positions(indices[:sample], lattice).astype(np.int64)
+    cost = HyperGeometrisomorphous._digit_counts(points[:, 0]).sum(axis=1)
+    if points.shape[1] > 1:
+        steps = np.diff(points, axis=1)
+        new_run = np.ones(steps.shape[:2], dtype=bool)
+        new_run[:, 1:] = np.any(steps[:, 1:] != steps[:, :-1], axis=2)
+        cost += ((HyperGeometrisomorphous._digit_counts(steps).sum(axis=2) + 3) * new_run).sum(axis=1)
+    return cost
+
+
+class HyperGeometrisomorphous:
+    # How many volumes each character is toured in, and the prior that picks them.
+    max_permutations = 30
+    volume_prior = staticmethod(text_order_prior)
+
+    def __init__(self, text: str, path_engine=None, max_permutations=None, volume_prior=None, metrics=None):
+        self.original_text = text
+        self.length = len(text)
+        self.path_engine = get_path_engine(path_engine)
+        self.metrics = metrics
+        if metrics is not None: started = time.perf_counter()
+        self.positions = self._build_position_index(text)
+        if metrics is not None: metrics.add_time('index', time.perf_counter() - started)
+        if max_permutations is not None: self.max_permutations = max_permutations
+        if volume_prior is not None: self.volume_prior = volume_prior
+
+    # Characters with at least this many occurrences are split into one job per
+    # permutation chunk, so a single dominant character cannot serialize the pool.
+    parallel_split_threshold = 512
+
+    @classmethod
+    def from_positions(cls, length, positions, path_engine=None, metrics=None):
+        """Builds an engine over a precomputed position index, without the source text."""
+        engine = cls.__new__(cls)
+        engine.original_text = None
+        engine.length = length
+        engine.path_engine = get_path_engine(path_engine)
+        engine.metrics = metrics
+        engine.positions = positions
+        return engine
+
+    @staticmethod
+    def _build_position_index(text):
+        """Maps every character to the ascending array of its offsets, in one pass over the text."""
+        if not text: return {}
+        codepoints = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        # A stable sort keeps each character's offsets ascending within its group.
+        order = np.argsort(codepoints, kind='stable')
+        grouped = codepoints[order]
+        bounds = np.flatnonzero(grouped[1:] != grouped[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(order)]))
+        return {chr(int(grouped[start])): order[start:end] for start, end in zip(starts, ends)}
+
+    @staticmethod
+    def _project_positions(indices, permutations):
+        """Projects linear offsets into (page, row, col) for every permutation at once: shape (P, n, 3)."""
+        dims = np.asarray(permutations, dtype=np.int64).reshape(-1, 3)
+        plane = (dims[:, 1] * dims[:, 2])[:, None]
+        pages, within = np.divmod(np.asarray(indices, dtype=np.int64)[None, :], plane)
+        rows, cols = np.divmod(within, dims[:, 2][:, None])
+        return np.stack((pages, rows, cols), axis=-1).astype(np.int32)
+
+    def _get_volume_permutations(self):
+        return list(_volume_permutations(self.length))
+
+    def _candidate_volumes(self, char, lattice):
+        """Picks the `max_permutations` volumes the prior rates best for `char`.
+
+        The list order is also the search's tie-break, so volumes with shorter
+        "PxRxC" labels come first: of two equally long paths they make the shorter codex.
+        """
+        chosen = range(len(lattice))
+        if len(lattice) > self.max_permutations:
+            scores = self.volume_prior(lattice, self.positions[char])
+            chosen = sorted(chosen, key=lambda i: (scores[i], i))[:self.max_permutations]
+        return [lattice[i] for i in sorted(chosen, key=lambda i: (len("{}x{}x{}".format(*lattice[i])), i))]
+
+    def _find_shortest_path(self, points):
+        return self.path_engine(points)
+
+    @staticmethod
+    def _run_lengths(vectors):
+        """Collapses consecutive identical rows of `vectors` into (run vectors, run counts)."""
+        if not len(vectors): return vectors, np.zeros(0, dtype=np.int64)
+        starts = np.ones(len(vectors), dtype=bool)
+        starts[1:] = np.any(vectors[1:] != vectors[:-1], axis=1)
+        first = np.flatnonzero(starts)
+        return vectors[first], np.diff(np.append(first, len(vectors)))
+
+    @staticmethod
+    def _digit_counts(values):
+        """Characters needed to print each integer in base 10, minus sign included."""
+        values = np.asarray(values, dtype=np.int64)
+        digits = np.searchsorted(_powers_of_ten(), np.abs(values), side='right')
+        return np.maximum(digits, 1) + (values < 0)
+
+    def _description_length(self, path):
+        """Exact len(self._encode_path(path)), computed without building the string."""
+        if len(path) == 0: return 0
+        path = np.asarray(path, dtype=np.int64)
+        # "S" and two commas around the start point.
+        length = 3 + int(self._digit_counts(path[0]).sum())
+        if len(path) == 1: return length
+        runs, counts = self._run_lengths(np.diff(path, axis=0))
+        # A separator and two commas per run, plus "*count" for runs longer than one.
+        length += 3 * len(runs) + int(self._digit_counts(runs).sum())
+        repeated = counts[counts > 1]
+        return length + len(repeated) + int(self._digit_counts(repeated).sum())
+
+    def _encode_path(self, path):
+        if len(path) == 0: return ""
+        path = np.asarray(path, dtype=np.int64)
+        start = "S{},{},{}".format(*path[0].tolist())
+        if len(path) == 1: return start
+        runs, counts = self._run_lengths(np.diff(path, axis=0))
+        rle_vectors = [f"{x},{y},{z}" + (f"*{count}" if count > 1 else "")
+                       for (x, y, z), count in zip(runs.tolist(), counts.tolist())]
+        return f"{start}|" + "|".join(rle_vectors)
+
+    @staticmethod
+    def _rank_permutations(indices, permutations):
+        """Orders permutations so the likely winners are toured first.
+
+        A volume whose column count divides a character's gaps turns those gaps into
+        repeated row or page steps, which the run-length encoding collapses.
+        """
+        gaps = np.diff(np.asarray(indices, dtype=np.int64))
+        if not len(gaps): return list(range(len(permutations)))
+        cols = np.array([dims[2] for dims in permutations], dtype=np.int64)
+        divisible = np.count_nonzero(gaps[None, :] % cols[:, None] == 0, axis=1)
+        return sorted(range(len(permutations)), key=lambda i: (-divisible[i], i))
+
+    def _bounded_tour(self, points, can_win, deadline=None):
+        """Walks the tour, checking the length of its encoded prefix at growing checkpoints.
+
+        A description only ever grows as the walk proceeds, so the tour is abandoned
+        as soon as `can_win` rejects the length of the prefix so far, or once `deadline`
+        passes (checked every 64 steps). Returns (path, length, points walked), with a
+        path of None for an abandoned tour, whose full length is at least `length`.
+        """
+        n = len(points)
+        length = self._description_length(points[:1])
+        # Every further point costs at least a separator and a five-character vector.
+        if n > 1: length += 6
+        if not can_win(length): return None, length, 0
+        order = np.empty(n, dtype=np.intp)
+        checkpoint = min(n, 64)
+        for step, i in enumerate(self.path_engine.walk(points)):
+            order[step] = i
+            if deadline is not None and not step % 64 and time.perf_counter() >= deadline: return None, length, step + 1
+            if step + 1 == checkpoint:
+                length = self._description_length(points[order[:checkpoint]])
+                if not can_win(length): return None, length, checkpoint
+                checkpoint = min(n, checkpoint + max(64, checkpoint // 8))
+        return points[order], length, n
+
+    def find_best_algorithm_for_char(self, char_to_find, permutations):
+        best, best_path, _ = self._branch_and_bound(char_to_find, permutations)
+        # Only the winning tour is ever serialized.
+        if best is not None:
+            stats = self.metrics
+            if stats is not None: started = time.perf_counter()
+            best['desc'] = self._encode_path(best_path)
+            if stats is not None: stats.add_time('encode', time.perf_counter() - started)
+        return best
+
+    def _branch_and_bound(self, char_to_find, permutations, incumbent=None, deadline=None):
+        """Tours `permutations` best-ranked first, keeping the shortest description.
+
+        `incumbent` is an (algorithm, path, rank) to beat, its rank placing it in the
+        tie-break order. Once `deadline` passes the search stops, abandoning the tour
+        in progress. Returns (best, best path, whether every permutation was settled).
+        """
+        best, best_path, best_rank = incumbent or (None, None, None)
+        all_indices = self.positions.get(char_to_find)
+        if all_indices is None or not len(permutations): return best, best_path, True
+        stats = self.metrics
+        if stats is not None: started = time.perf_counter()
+        projections = self._project_positions(all_indices, permutations)
+        if stats is not None: stats.add_time('projection', time.perf_counter() - started)
+        expired = False
+
+        def in_time():
+            nonlocal expired
+            expired = expired or (deadline is not None and time.perf_counter() >= deadline)
+            return not expired
+
+        # Branch and bound: the winner is the shortest description, earliest permutation on a
+        # tie, so any tour whose partial description cannot beat the best so far is dropped.
+        for rank in self._rank_permutations(all_indices, permutations):
+            if not in_time(): break
+            def can_win(length):
+                return best is None or length < best['desc_len'] or (length == best['desc_len'] and rank < best_rank)
+            if stats is not None: started = time.perf_counter()
+            path, desc_len, walked = self._bounded_tour(projections[rank], can_win, deadline)
+            if stats is not None:
+                stats.add_time('tours', time.perf_counter() - started)
+                stats.count('permutations_evaluated')
+                stats.count('points_evaluated', walked)
+                if path is None: stats.count('tours_pruned')
+            if path is None and not in_time(): break
+            if path is None or not can_win(desc_len): continue
+            best_path = path
+            best = {'dims': permutations[rank], 'desc_len': desc_len}
+            best_rank = rank
+        return best, best_path, not expired
+
+    def _quick_algorithm(self, char):
+        """A valid algorithm without any tour or prior: the points visited in text order along
+        the single row of the (1, 1, length) volume. Returns (algorithm, path)."""
+        indices = self.positions[char]
+        path = np.zeros((len(indices), 3), dtype=np.int32)
+        path[:, 2] = indices
+        desc = self._encode_path(path)
+        return {'dims': (1, 1, self.length), 'desc_len': len(desc), 'desc': desc}, path
+
+    def _two_opt(self, path, length, deadline, window=8):
+        """Reverses stretches of the path between run breaks while that shortens its description.
+
+        The decoder places points wherever the path visits them, so any order is valid.
+        Returns (path, length, whether no improving reversal was left).
+        """
+        while True:
+            starts = np.ones(max(len(path) - 1, 0), dtype=bool)
+            if len(path) > 2:
+                steps = np.diff(path.astype(np.int64), axis=0)
+                starts[1:] = np.any(steps[1:] != steps[:-1], axis=1)
+            cuts = np.append(np.flatnonzero(starts), len(path)).tolist()
+            improved = False
+            for a, i in enumerate(cuts):
+                for j in cuts[a + 1:a + 1 + window]:
+                    if time.perf_counter() >= deadline: return path, length, False
+                    candidate = np.concatenate((path[:i], path[i:j][::-1], path[j:]))
+                    candidate_length = self._description_length(candidate)
+                    if candidate_length < length:
+                        path, length, improved = candidate, candidate_length, True
+                        break
+                if improved: break
+            if not improved: return path, length, True
+
+    def _search_anytime(self, unique_chars, lattice, budget, progress, cancel):
+        """Returns a valid codex within roughly `budget` seconds, improving it while time remains.
+
+        Every character first gets a tour-free algorithm, then the usual capped
+        search, then the rest of the lattice, then 2-opt refinement of its winning
+        path, each stage running over all characters before the next begins. Only the
+        first stage, one linear encoding of the text, runs regardless of the budget;
+        volume priors, tours and later encodings happen per character, under the deadline.
+        """
+        deadline = time.perf_counter() + budget
+        best = {char: self._quick_algorithm(char) for char in unique_chars}
+        candidates = {}
+        completed = dict.fromkeys(('searched', 'extended', 'refined'), 0)
+
+        def improve(char, algo, path):
+            # Winners are encoded as soon as they change, so no encoding is left for after the deadline.
+            if path is not best[char][1]: algo = dict(algo, desc=self._encode_path(path))
+            best[char] = algo, path
+
+        def checkpoint(stage):
+            if cancel is not None and cancel.is_set(): raise AnalysisCancelled()
+            completed[stage] += 1
+            if progress: progress(sum(completed.values()), 3 * len(unique_chars))
+
+        for char in unique_chars:
+            if time.perf_counter() >= deadline: break
+            candidates[char] = self._candidate_volumes(char, lattice)
+            # The quick algorithm loses ties, so a full run matches generate_blueprint() or beats it.
+            algo, path, finished = self._branch_and_bound(char, candidates[char], best[char] + (len(candidates[char]),), deadline)
+            improve(char, algo, path)
+            if not finished: break
+            checkpoint('searched')
+        else:
+            for char in unique_chars:
+                if time.perf_counter() >= deadline: break
+                chosen = set(candidates[char])
+                extra = [dims for dims in lattice if dims not in chosen]
+                if len(extra) > 1:
+                    scores = self.volume_prior(extra, self.positions[char])
+                    extra = [extra[i] for i in sorted(range(len(extra)), key=lambda i: (scores[i], i))]
+                algo, path, finished = self._branch_and_bound(char, extra, best[char] + (-1,), deadline)
+                improve(char, algo, path)
+                if not finished: break
+                checkpoint('extended')
+            else:
+                # The longest descriptions have the most to gain, so they are refined first.
+                for char in sorted(unique_chars, key=lambda c: -best[c][0]['desc_len']):
+                    algo, path = best[char]
+                    path, desc_len, finished = self._two_opt(path, algo['desc_len'], deadline)
+                    improve(char, dict(algo, desc_len=desc_len), path)
+                    if not finished: break
+                    checkpoint('refined')
+
+        winning_algorithms = {char: algo for char, (algo, _) in best.items()}
+        search = dict(completed, characters=len(unique_chars), budget=budget,
+                      complete=all(count == len(unique_chars) for count in completed.values()))
+        return winning_algorithms, search
+
+    def _search_serial(self, unique_chars, lattice, progress, cancel):
+        results = {}
+        for done, char in enumerate(unique_chars, 1):
+            if cancel is not None and cancel.is_set(): raise AnalysisCancelled()
+            results[char] = self.find_best_algorithm_for_char(char, self._candidate_volumes(char, lattice))
+            if progress: progress(done, len(unique_chars))
+        return results
+
+    def _search_parallel(self, unique_chars, lattice, workers, progress=None, cancel=None):
+        """Fans the (character x permutation) grid out over the process pool.
+
+        Offsets travel through one shared-memory block rather than pickled lists. Each
+        character's chunk winners are merged in permutation order, so ties resolve exactly
+        as in the serial search.
+        """
+        from multiprocessing import shared_memory
+        total = sum(len(self.positions[char]) for char in unique_chars)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, total) * 8)
+        try:
+            flat = np.ndarray((total,), dtype=np.int64, buffer=shm.buf)
+            pool = get_search_pool(workers)
+            jobs = {}
+            cursor = 0
+            for char in unique_chars:
+                count = len(self.positions[char])
+                flat[cursor:cursor + count] = self.positions[char]
+                permutations = self._candidate_volumes(char, lattice)
+                if count >= self.parallel_split_threshold:
+                    step = max(1, -(-len(permutations) // workers))
+                    chunks = [permutations[i:i + step] for i in range(0, len(permutations), step)]
+                else:
+                    chunks = [permutations]
+                jobs[char] = [pool.submit(_search_job, shm.name, total, cursor, cursor + count, char,
+                                          self.length, chunk, self.path_engine, self.metrics is not None)
+                              for chunk in chunks]
+                cursor += count
+            results = {}
+            for done, char in enumerate(unique_chars, 1):
+                if cancel is not None and cancel.is_set():
+                    for futures in jobs.values():
+                        for future in futures: future.cancel()
+                    raise AnalysisCancelled()
+                winners = []
+                for future in jobs[char]:
+                    winner, worker_stats = future.result()
+                    if worker_stats is not None: self.metrics.merge(worker_stats)
+                    if winner: winners.append(winner)
+                results[char] = min(winners, key=lambda x: x['desc_len']) if winners else None
+                if progress: progress(done, len(unique_chars))
+            del flat
+            return results
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def generate_blueprint(self, workers=1, progress=None, cancel=None, budget=None):
+        """Searches every character's best algorithm and assembles the codex.
+
+        `progress(done, total)` is called after each character; setting the `cancel`
+        event stops the search between characters by raising AnalysisCancelled.
+        With a `budget` in seconds the search runs serially in anytime mode (see
+        _search_anytime), and the blueprint's "search" entry reports how far it got.
+        """
+        if self.metrics is not None: started = time.perf_counter()
+        lattice = self._get_volume_permutations()
+        if self.metrics is not None: self.metrics.add_time('enumerate', time.perf_counter() - started)
+        unique_chars = sorted(self.positions)
+        if budget is not None:
+            started = time.perf_counter()
+            winning_algorithms, search = self._search_anytime(unique_chars, lattice, budget, progress, cancel)
+            search['elapsed'] = time.perf_counter() - started
+            return dict(self._assemble_blueprint(winning_algorithms), search=search)
+        if workers and workers > 1 and unique_chars:
+            winning_algorithms = self._search_parallel(unique_chars, lattice, workers, progress, cancel)
+        else:
+            winning_algorithms = self._search_serial(unique_chars, lattice, progress, cancel)
+        return self._assemble_blueprint(winning_algorithms)
+
+    def _assemble_blueprint(self, winning_algorithms):
+        winning_algorithms = {k: v for k, v in winning_algorithms.items() if v}
+        
+        codex = [[f"len:{self.length}"]]
+        for char, algo in sorted(winning_algorithms.items()):
+            codex.append([char, f"{algo['dims'][0]}x{algo['dims'][1]}x{algo['dims'][2]}", algo['desc']])
+        
+        serialized_codex = "§".join(["|".join(map(str, row)) for row in codex])
+        return {"engine": "hyper-geometrisomorphous", "codex": codex, "serialized_codex": serialized_codex, "original_text": self.original_text}
+
+# --- Decoder: Reconstitution from a Serialized Codex ---
+_VECTOR_RUN = re.compile(r'(-?\d+),(-?\d+),(-?\d+)(?:\*(\d+))?')
+
+
+class HyperGeometrisomorphousDecoder:
+    """Expands a serialized codex back into its text without walking it one character at a time.
+
+    Each row's run-length vectors are repeated and cumulatively summed into flat offsets
+    in bulk, and the row's character is scattered into a preallocated codepoint array.
+    Codices declaring more than `max_length` characters are rejected before anything
+    is allocated, since the header alone decides how large that array is.
+    """
+
+    max_length = 1 << 28
+
+    def __init__(self, serialized_codex: str, max_length=None):
+        self.serialized_codex = serialized_codex
+        if max_length is not None: self.max_length = max_length
+        self.length, self.rows = self._parse(serialized_codex)
+        self._check_length(self.length, self.max_length)
+
+    @staticmethod
+    def _parse(serialized_codex):
+        header, sep, body = serialized_codex.partition("§")
+        if not header.startswith("len:"):
+            raise ValueError("Codex is missing its 'len:' header.")
+        length = int(header[4:])
+        rows = []
+        cursor = 0
+        # Rows are split by hand: a row's leading character may itself be '§' or '|',
+        # but nothing after it ever is anything but digits, 'x', 'S', ',', '*', '-' or '|'.
+        while sep and cursor < len(body):
+            char = body[cursor]
+            end = body.find("§", cursor + 1)
+            end = len(body) if end == -1 else end
+            dims, _, path_desc = body[cursor + 2:end].partition("|")
+            rows.append((char, tuple(int(d) for d in dims.split("x")), path_desc))
+            cursor = end + 1
+        return length, rows
+
+    @staticmethod
+    def _parse_path(path_desc):
+        """Splits a path description into its start point, run vectors and run counts."""
+        start, _, vectors = path_desc.partition("|")
+        if not start[1:]: return None
+        origin = np.array([int(v) for v in start[1:].split(",")], dtype=np.int64)
+        runs = _VECTOR_RUN.findall(vectors)
+        steps = np.array([run[:3] for run in runs], dtype=np.int64).reshape(-1, 3)
+        counts = np.array([run[3] or 1 for run in runs], dtype=np.int64)
+        return origin, steps, counts
+
+    @staticmethod
+    def _check_length(length, max_length):
+        if length > max_length:
+            raise ValueError(f"Codex declares {length} characters, more than the limit of {max_length}.")
+
+    @staticmethod
+    def _claim_points(counts, remaining):
+        """Takes a row's points (its start plus one per step) from the `remaining` the codex may still place.
+
+        Every character is placed once, so all rows together cannot visit more points
+        than the text has characters; checking the running total bounds the whole
+        decode by the declared length, however many rows a codex holds.
+        """
+        if len(counts) and (counts.min() < 0 or counts.max() > remaining):
+            raise ValueError("Codex rows visit more points than the text has characters.")
+        remaining -= int(counts.sum()) + 1
+        if remaining < 0:
+            raise ValueError("Codex rows visit more points than the text has characters.")
+        return remaining
+
+    @staticmethod
+    def _expand_runs(origin, steps, counts, dims):
+        """Returns the flat text offsets visited from `origin` by the run-length vectors."""
+        points = np.cumsum(np.vstack((origin, np.repeat(steps, counts, axis=0))), axis=0)
+        _, rows, cols = dims
+        return points @ np.array([rows * cols, cols, 1], dtype=np.int64)
+
+    @staticmethod
+    def _scatter(length, placements):
+        """Writes each (codepoint, offsets) placement into a canvas of `length` characters as it arrives,
+        so only one row's offsets are held at a time."""
+        canvas = np.zeros(length, dtype=np.uint32)
+        filled = np.zeros(length, dtype=bool)
+        for codepoint, offsets in placements:
+            offsets = offsets[(offsets >= 0) & (offsets < length)]
+            canvas[offsets] = codepoint
+            filled[offsets] = True
+        # Like the browser reconstruction, positions no row claims are simply left out.
+        return canvas[filled].tobytes().decode('utf-32-le', 'surrogatepass')
+
+    def decode(self):
+        return self._scatter(self.length, self._placements())
+
+    def _placements(self):
+        remaining = self.length
+        for char, dims, path_desc in self.rows:
+            parsed = self._parse_path(path_desc)
+            if parsed is not None:
+                remaining = self._claim_points(parsed[2], remaining)
+                yield ord(char), self._expand_runs(*parsed, dims)
+
+
+class BinaryCodex:
+    """Compact binary codex: a fixed header followed by one stream of LEB128 varints.
+
+    Layout::
+
+        header   magic b"HGC1", text length (u64 LE), record count (u32 LE)
+        record   codepoint, pages, rows, cols, start page, start row, start col, run count,
+                 then per run: zigzag(dx), zigzag(dy), zigzag(dz), count
+
+    Every field after the header is a varint, so the whole body is decoded in one
+    vectorized pass over an `np.frombuffer` view of the input; no character of the text
+    needs escaping, unlike the '§'/'|' separated form.
+    """
+    MAGIC = b"HGC1"
+    MIMETYPE = "application/x-hgi-codex"
+    HEADER = struct.Struct('<4sQI')
+
+    @staticmethod
+    def _varint_encode(values):
+        values = np.asarray(values, dtype=np.uint64)
+        sizes = np.ones(len(values), dtype=np.int64)
+        for k in range(1, 10):
+            sizes += values >= np.uint64(1 << (7 * k))
+        out = np.empty(int(sizes.sum()), dtype=np.uint8)
+        starts = np.cumsum(sizes) - sizes
+        for k in range(int(sizes.max()) if len(sizes) else 0):
+            live = sizes > k
+            chunk = (values[live] >> np.uint64(7 * k)) & np.uint64(0x7F)
+            more = np.where(sizes[live] > k + 1, 0x80, 0).astype(np.uint64)
+            out[starts[live] + k] = chunk | more
+        return out
+
+    @staticmethod
+    def _varint_decode(data):
+        data = np.frombuffer(data, dtype=np.uint8)
+        if not len(data): return np.zeros(0, dtype=np.uint64)
+        ends = np.flatnonzero(data < 0x80)
+        if not len(ends) or ends[-1] != len(data) - 1:
+            raise ValueError("Binary codex ends inside a varint.")
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        shift = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+        if shift.max() > 9:
+            raise ValueError("Binary codex holds a varint longer than 64 bits.")
+        groups = (data & 0x7F).astype(np.uint64) << (7 * shift).astype(np.uint64)
+        return np.add.reduceat(groups, starts)
+
+    @classmethod
+    def encode(cls, codex):
+        """Packs the rows of a text codex (as returned by generate_blueprint) into bytes."""
+        length = int(codex[0][0].partition(":")[2])
+        fields = []
+        records = 0
+        for char, dims, path_desc in codex[1:]:
+            parsed = HyperGeometrisomorphousDecoder._parse_path(path_desc)
+            if parsed is None: continue
+            origin, steps, counts = parsed
+            runs = np.column_stack(((steps << 1) ^ (steps >> 63), counts)).astype(np.uint64)
+            fields.append(np.array([ord(char), *map(int, dims.split("x")), *origin.tolist(), len(counts)], dtype=np.uint64))
+            fields.append(runs.ravel())
+            records += 1
+        body = cls._varint_encode(np.concatenate(fields) if fields else [])
+        return cls.HEADER.pack(cls.MAGIC, length, records) + body.tobytes()
+
+    @classmethod
+    def decode(cls, data, max_length=None):
+        """Expands a binary codex back into text, reading `data` in place through a memoryview.
+
+        Codices over `max_length` characters (HyperGeometrisomorphousDecoder.max_length
+        by default) are rejected.
+        """
+        view = memoryview(data).cast('B')
+        if len(view) < cls.HEADER.size:
+            raise ValueError("Binary codex is shorter than its header.")
+        magic, length, records = cls.HEADER.unpack_from(view)
+        if magic != cls.MAGIC:
+            raise ValueError("Binary codex has an unknown magic number.")
+        HyperGeometrisomorphousDecoder._check_length(length, max_length or HyperGeometrisomorphousDecoder.max_length)
+        values = cls._varint_decode(view[cls.HEADER.size:]).astype(np.int64)
+        return HyperGeometrisomorphousDecoder._scatter(length, cls._placements(values, length, records))
+
+    @staticmethod
+    def _placements(values, length, records):
+        remaining = length
+        cursor = 0
+        for _ in range(records):
+            meta = values[cursor:cursor + 8]
+            if len(meta) < 8:
+                raise ValueError("Binary codex ends inside a record header.")
+            run_count = int(meta[7])
+            runs = values[cursor + 8:cursor + 8 + 4 * run_count].reshape(-1, 4)
+            if len(runs) != run_count:
+                raise ValueError("Binary codex ends inside a record's runs.")
+            remaining = HyperGeometrisomorphousDecoder._claim_points(runs[:, 3], remaining)
+            steps = (runs[:, :3] >> 1) ^ -(runs[:, :3] & 1)
+            yield int(meta[0]), HyperGeometrisomorphousDecoder._expand_runs(meta[4:7], steps, runs[:, 3], tuple(meta[1:4].tolist()))
+            cursor += 8 + 4 * run_count
+
+
+# --- Streaming: Chunked Container of Block Codices ---
+def _encode_block(text, engine_options):
+    """Worker side of the streaming encoder: one block of text to one binary codex."""
+    return BinaryCodex.encode(HyperGeometrisomorphous(text, **engine_options).generate_blueprint()['codex'])
+
+
+class StreamingCodex:
+    """Encodes arbitrarily long UTF-8 input as a sequence of independent block codices.
+
+    The input is read `block_size` bytes at a time and every block is wrapped into its
+    own volumes, so peak memory follows the block size rather than the input. The
+    container is the magic b"HGS1" followed by frames of a u32 LE byte count and a
+    BinaryCodex; a zero count ends it. Each frame decodes on its own. The engine
+    options are applied to every block, so with `workers > 1` they must pickle.
+    """
+    MAGIC = b"HGS1"
+    MIMETYPE = "application/x-hgi-stream"
+    FRAME = struct.Struct('<I')
+
+    def __init__(self, block_size=16384, workers=1, path_engine=None, max_permutations=None, volume_prior=None):
+        self.block_size = block_size
+        self.workers = workers
+        self.engine_options = {'path_engine': path_engine, 'max_permutations': max_permutations, 'volume_prior': volume_prior}
+
+    def read_blocks(self, source, use_mmap=False):
+        """Yields text blocks from a path or a binary stream, never splitting a character."""
+        if isinstance(source, (str, bytes, os.PathLike)):
+            with open(source, 'rb') as handle:
+                if use_mmap and os.fstat(handle.fileno()).st_size:
+                    with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        yield from self._decode_chunks(self._slices(memoryview(mapped)))
+                else:
+                    yield from self._decode_chunks(iter(lambda: handle.read(self.block_size), b''))
+        else:
+            yield from self._decode_chunks(iter(lambda: source.read(self.block_size), b''))
+
+    def _slices(self, view):
+        try:
+            for start in range(0, len(view), self.block_size):
+                yield view[start:start + self.block_size]
+        finally:
+            view.release()
+
+    @staticmethod
+    def _decode_chunks(chunks):
+        decoder = codecs.getincrementaldecoder('utf-8')('surrogatepass')
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text: yield text
+        text = decoder.decode(b'', final=True)
+        if text: yield text
+
+    def encode_blocks(self, blocks):
+        """Yields the container's bytes: the magic, then one frame per block, then the end marker."""
+        yield self.MAGIC
+        if self.workers and self.workers > 1:
+            # Keep only a small window of blocks in flight so memory stays bounded.
+            pool = get_search_pool(self.workers)
+            window = deque()
+            for block in blocks:
+                window.append(pool.submit(_encode_block, block, self.engine_options))
+                if len(window) >= 2 * self.workers:
+                    yield self._frame(window.popleft().result())
+            while window:
+                yield self._frame(window.popleft().result())
+        else:
+            for block in blocks:
+                yield self._frame(_encode_block(block, self.engine_options))
+        yield self.FRAME.pack(0)
+
+    def encode(self, source, use_mmap=False):
+        return self.encode_blocks(self.read_blocks(source, use_mmap))
+
+    def _frame(self, payload):
+        return self.FRAME.pack(len(payload)) + payload
+
+    @classmethod
+    def decode_blocks(cls, stream, max_length=None):
+        """Returns an iterator over the text of each frame in a container read from bytes or a binary stream.
+
+        The magic number is checked right away, before the first frame is read.
+        """
+        if isinstance(stream, (bytes, bytearray, memoryview)):
+            stream = io.BytesIO(stream)
+        if stream.read(len(cls.MAGIC)) != cls.MAGIC:
+            raise ValueError("Stream container has an unknown magic number.")
+        return cls._decode_frames(stream, max_length)
+
+    @classmethod
+    def _decode_frames(cls, stream, max_length):
+        while True:
+            size = stream.read(cls.FRAME.size)
+            if len(size) < cls.FRAME.size:
+                raise ValueError("Stream container ends without its end marker.")
+            size, = cls.FRAME.unpack(size)
+            if not size: return
+            payload = stream.read(size)
+            if len(payload) < size:
+                raise ValueError("Stream container ends inside a frame.")
+            yield BinaryCodex.decode(payload, max_length)
+
+
+
+# --- Incremental Sessions: Re-encoding Edited Text ---
+class EncodingSession:
+    """Keeps an edited document as independent blocks, so an edit re-encodes only the blocks it touches.
+
+    A codex's volumes follow from the length of its text, so any edit that changes
+    the length of a single codex invalidates its whole search. The session therefore
+    holds the text as blocks of at most `block_size` characters, each encoded on its
+    own as one frame of a StreamingCodex container. An append re-encodes only the
+    last block, or none once it is full; any other splice re-encodes the blocks it
+    overlaps, split evenly and merged with a neighbour when short, so every block but
+    the last stays at least half full.
+    """
+
+    def __init__(self, text='', block_size=1024, path_engine=None, max_permutations=None, volume_prior=None):
+        self.block_size = block_size
+        self.engine_options = {'path_engine': path_engine, 'max_permutations': max_permutations, 'volume_prior': volume_prior}
+        self._blocks = []
+        self.last_update = {'reencoded': [], 'reused': 0}
+        if text: self.append(text)
+
+    @property
+    def text(self):
+        return "".join(block['text'] for block in self._blocks)
+
+    def __len__(self):
+        return sum(len(block['text']) for block in self._blocks)
+
+    def append(self, text):
+        length = len(self)
+        self.splice(length, length, text)
+
+    def splice(self, start, end, replacement=''):
+        """Replaces text[start:end] with `replacement`, re-splitting only the blocks it overlaps."""
+        length = len(self)
+        if not 0 <= start <= end <= length:
+            raise ValueError(f"Splice range {start}:{end} is outside a text of length {length}.")
+        if start == end and not replacement: return
+        blocks, size = self._blocks, self.block_size
+        # The edit starts in the block holding text[start]; at the very end it extends the
+        # last block, unless that block is full and new text starts a block of its own.
+        first, offset = 0, 0
+        while first < len(blocks) and offset + len(blocks[first]['text']) <= start:
+            offset += len(blocks[first]['text'])
+            first += 1
+        if first == len(blocks) and blocks and len(blocks[-1]['text']) < size:
+            first -= 1
+            offset -= len(blocks[first]['text'])
+        last, stop = first, offset
+        while last < len(blocks) and (stop < end or last == first):
+            stop += len(blocks[last]['text'])
+            last += 1
+        region = "".join(block['text'] for block in blocks[first:last])
+        region = region[:start - offset] + replacement + region[end - offset:]
+        if last < len(blocks) and 0 < len(region) < size // 2:
+            # Too short to stand alone: fold it into the next block rather than leave a fragment.
+            region += blocks[last]['text']
+            last += 1
+        if start == length:
+            # Appends fill blocks in order, so later appends only ever touch the last one.
+            pieces = [region[i:i + size] for i in range(0, len(region), size)]
+        else:
+            # Elsewhere the region is split evenly, keeping every block at least half full.
+            count = -(-len(region) // size)
+            pieces = [region[i * len(region) // count:(i + 1) * len(region) // count] for i in range(count)]
+        blocks[first:last] = [{'text': piece, 'blueprint': None, 'frame': None} for piece in pieces]
+
+    def blueprints(self):
+        """Every block's blueprint, encoding only the blocks edited since the last call."""
+        reencoded = []
+        for index, block in enumerate(self._blocks):
+            if block['blueprint'] is None:
+                block['blueprint'] = HyperGeometrisomorphous(block['text'], **self.engine_options).generate_blueprint()
+                reencoded.append(index)
+        self.last_update = {'reencoded': reencoded, 'reused': len(self._blocks) - len(reencoded)}
+        return [block['blueprint'] for block in self._blocks]
+
+    def container(self):
+        """The whole document as a StreamingCodex container, one frame per block."""
+        self.blueprints()
+        frames = [StreamingCodex.MAGIC]
+        for block in self._blocks:
+            if block['frame'] is None:
+                payload = BinaryCodex.encode(block['blueprint']['codex'])
+                block['frame'] = StreamingCodex.FRAME.pack(len(payload)) + payload
+            frames.append(block['frame'])
+        frames.append(StreamingCodex.FRAME.pack(0))
+        return b"".join(frames)
+
+
+# --- Command Line: compress / decompress ---
+def _read_input(path):
+    return sys.stdin.buffer if path == '-' else open(path, 'rb')
+
+
+def _write_output(path):
+    import contextlib
+    return contextlib.nullcontext(sys.stdout.buffer) if path == '-' else open(path, 'wb')
+
+
+def compress(args):
+    if args.format == 'stream':
+        encoder = StreamingCodex(block_size=args.block_size, workers=args.workers,
+                                  max_permutations=args.max_permutations)
+        source = sys.stdin.buffer if args.input == '-' else args.input
+        with _write_output(args.output) as out:
+            for chunk in encoder.encode(source, use_mmap=args.mmap):
+                out.write(chunk)
+        return
+    with _read_input(args.input) as handle:
+        text = handle.read().decode('utf-8', 'surrogatepass')
+    analyzer = HyperGeometrisomorphous(text, max_permutations=args.max_permutations)
+    blueprint = analyzer.generate_blueprint(workers=args.workers, budget=args.budget)
+    if args.format == 'binary':
+        payload = BinaryCodex.encode(blueprint['codex'])
+    else:
+        payload = blueprint['serialized_codex'].encode('utf-8', 'surrogatepass')
+    with _write_output(args.output) as out:
+        out.write(payload)
+
+
+def decompress(args):
+    """Expands any of the three forms, recognised by their leading bytes."""
+    with _read_input(args.input) as handle, _write_output(args.output) as out:
+        magic = handle.peek(4)[:4]
+        if magic == StreamingCodex.MAGIC:
+            for block in StreamingCodex.decode_blocks(handle):
+                out.write(block.encode('utf-8', 'surrogatepass'))
+            return
+        data = handle.read()
+        if magic == BinaryCodex.MAGIC:
+            text = BinaryCodex.decode(data)
+        else:
+            text = HyperGeometrisomorphousDecoder(data.decode('utf-8', 'surrogatepass')).decode()
+        out.write(text.encode('utf-8', 'surrogatepass'))
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='engine.py', description="Compress text into a Hyper-Geometrisomorphous codex, or expand one back.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    packer = commands.add_parser('compress', help="Encode a UTF-8 text file (or stdin).")
+    packer.add_argument('input', nargs='?', default='-', help="File to read; '-' or omitted for stdin.")
+    packer.add_argument('-o', '--output', default='-', help="File to write; '-' or omitted for stdout.")
+    packer.add_argument('--format', choices=('binary', 'text', 'stream'), default='binary',
+                        help="binary codex (default), the '§'-separated text codex, or a container of block codices.")
+    packer.add_argument('--block-size', type=int, default=16384, help="Bytes per block with --format stream.")
+    packer.add_argument('--mmap', action='store_true', help="Memory-map the input file with --format stream.")
+    packer.add_argument('--workers', type=int, default=1, help="Size of the search process pool.")
+    packer.add_argument('--max-permutations', type=int, default=None, help="Volumes toured per character.")
+    packer.add_argument('--budget', type=float, default=None,
+                        help="Seconds to search before keeping the best codex so far (not with --format stream).")
+
+    unpacker = commands.add_parser('decompress', help="Expand a codex of any format back into text.")
+    unpacker.add_argument('input', nargs='?', default='-', help="File to read; '-' or omitted for stdin.")
+    unpacker.add_argument('-o', '--output', default='-', help="File to write; '-' or omitted for stdout.")
+
+    args = parser.parse_args(argv)
+    try:
+        (compress if args.command == 'compress' else decompress)(args)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
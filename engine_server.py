@@ -1,12 +1,21 @@
 import sys
 import subprocess
 import webbrowser
-from threading import Timer
+from threading import Timer, Lock, Event
 import os
 import math
 import json
 import heapq
 import re
+import cProfile
+import pstats
+import hashlib
+import sqlite3
+import time
+import uuid
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Dependency Verification ---
 def install_dependencies():
@@ -30,82 +39,312 @@ def install_dependencies():
                 sys.exit(1)
     print("All dependencies are satisfied.")
 
-install_dependencies()
+if __name__ == '__main__':
+    # Only the server needs Flask; importing this module never shells out to pip.
+    install_dependencies()
 
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import numpy as np
-
-# --- Engine Logic: Hyper-Geometrisomorphous ---
-class HyperGeometrisomorphous:
-    def __init__(self, text: str):
-        self.original_text = text
-        self.length = len(text)
-
-    def _get_volume_permutations(self):
-        permutations = set()
-        for pages in range(1, int(self.length**0.33) + 2):
-            if self.length % pages == 0:
-                area = self.length // pages
-                for rows in range(1, int(area**0.5) + 2):
-                    if area % rows == 0:
-                        cols = area // rows
-                        if pages * rows * cols == self.length:
-                           permutations.add(tuple(sorted((pages, rows, cols))))
-        if not permutations: permutations.add((1, 1, self.length))
-        return sorted(list(permutations), key=lambda x: x[0]*x[1]*x[2])[:30]
-
-    def _find_shortest_path(self, points):
-        if not points: return []
-        path = [points.pop(0)]
-        while points:
-            last_point = path[-1]
-            distances = [np.linalg.norm(np.array(last_point) - np.array(p)) for p in points]
-            nearest_index = np.argmin(distances)
-            path.append(points.pop(nearest_index))
-        return path
-
-    def _encode_path(self, path):
-        if not path: return ""
-        if len(path) == 1: return f"S{path[0][0]},{path[0][1]},{path[0][2]}"
-        start_point = path[0]
-        vectors = [tuple(np.array(path[i+1]) - np.array(path[i])) for i in range(len(path) - 1)]
-        if not vectors: return f"S{','.join(map(str, start_point))}"
-        rle_vectors = []
-        count = 1
-        for i in range(1, len(vectors)):
-            if vectors[i] == vectors[i-1]:
-                count += 1
-            else:
-                rle_vectors.append(f"{','.join(map(str, vectors[i-1]))}" + (f"*{count}" if count > 1 else ""))
-                count = 1
-        rle_vectors.append(f"{','.join(map(str, vectors[-1]))}" + (f"*{count}" if count > 1 else ""))
-        return f"S{','.join(map(str, start_point))}|" + "|".join(rle_vectors)
-
-    def find_best_algorithm_for_char(self, char_to_find, permutations):
-        candidates = []
-        all_indices = [i for i, char in enumerate(self.original_text) if char == char_to_find]
-        if not all_indices: return None
-        for dims in permutations:
-            pages, rows, cols = dims
-            points = [(idx // (rows * cols), (idx % (rows * cols)) // cols, idx % cols) for idx in all_indices]
-            path = self._find_shortest_path(points.copy())
-            path_desc = self._encode_path(path)
-            candidates.append({'dims': dims, 'desc': path_desc, 'desc_len': len(path_desc)})
-        return min(candidates, key=lambda x: x['desc_len']) if candidates else None
-
-    def generate_blueprint(self):
-        permutations = self._get_volume_permutations()
-        unique_chars = sorted(list(set(self.original_text)))
-        winning_algorithms = {char: self.find_best_algorithm_for_char(char, permutations) for char in unique_chars}
-        winning_algorithms = {k: v for k, v in winning_algorithms.items() if v}
-        
-        codex = [[f"len:{self.length}"]]
-        for char, algo in sorted(winning_algorithms.items()):
-            codex.append([char, f"{algo['dims'][0]}x{algo['dims'][1]}x{algo['dims'][2]}", algo['desc']])
-        
-        serialized_codex = "§".join(["|".join(map(str, row)) for row in codex])
-        return {"engine": "hyper-geometrisomorphous", "codex": codex, "serialized_codex": serialized_codex, "original_text": self.original_text}
+
+from engine import (CODEX_VERSION, AnalysisCancelled, BinaryCodex, EncodingSession, HyperGeometrisomorphous,
+                    HyperGeometrisomorphousDecoder, PhaseStats, StreamingCodex, _volume_permutations)
+
+# --- Instrumentation: Histograms, Prometheus Text ---
+class Histogram:
+    """A labelled Prometheus histogram with fixed buckets."""
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 120.0)
+
+    def __init__(self, name, help_text, label):
+        self.name, self.help_text, self.label = name, help_text, label
+        self._series = {}
+
+    def observe(self, label_value, value):
+        buckets, totals = self._series.setdefault(label_value, ([0] * len(self.BUCKETS), [0.0, 0]))
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound: buckets[i] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, (buckets, (total, count)) in sorted(self._series.items()):
+            label = f'{self.label}="{label_value}"'
+            for bound, n in zip(self.BUCKETS, buckets):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {n}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Aggregates per-analysis PhaseStats and request latencies for the /metrics endpoint."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.phases = Histogram("hgi_phase_seconds", "Seconds spent per engine phase in one analysis.", "phase")
+        self.requests = Histogram("hgi_request_seconds", "Seconds spent serving a request.", "endpoint")
+        self.counters = {}
+
+    def observe_analysis(self, stats):
+        with self._lock:
+            for phase, seconds in stats.seconds.items():
+                self.phases.observe(phase, seconds)
+            for name, n in stats.counts.items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            self.counters['analyses'] = self.counters.get('analyses', 0) + 1
+
+    def observe_request(self, endpoint, seconds):
+        with self._lock:
+            self.requests.observe(endpoint, seconds)
+
+    def render(self, gauges=None, counters=None):
+        """Prometheus text exposition of every histogram and counter, plus the given external ones."""
+        with self._lock:
+            lines = self.phases.render() + self.requests.render()
+            for name, n in sorted({**self.counters, **(counters or {})}.items()):
+                lines += [f"# TYPE hgi_{name}_total counter", f"hgi_{name}_total {n}"]
+        for name, value in sorted((gauges or {}).items()):
+            lines += [f"# TYPE hgi_{name} gauge", f"hgi_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+# --- Blueprint Cache: Content-Addressed, LRU, Optional Disk Tier ---
+class BlueprintCache:
+    """Finished blueprints keyed by a SHA-256 of their text and a `fingerprint`.
+
+    The fingerprint names whatever else decides the blueprint (engine version, search
+    settings), so entries made under other settings are never served.
+
+    The memory tier holds JSON-encoded blueprints (without the text itself) under a
+    byte budget and evicts the least recently used first. When a directory is given,
+    entries are also written to a sqlite file there, so warm state survives restarts;
+    that tier has its own budget and evicts by last access.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None, disk_max_bytes=1024 * 1024 * 1024, fingerprint=''):
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint
+        self.disk_max_bytes = disk_max_bytes
+        self.current_bytes = 0
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._db = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(directory, "blueprints.sqlite"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS blueprints (key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)")
+            self._db.commit()
+
+    def key_for(self, text):
+        digest = hashlib.sha256(self.fingerprint.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def get(self, text):
+        """Returns the cached blueprint for `text`, or None."""
+        key = self.key_for(text)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            elif self._db is not None:
+                row = self._db.execute("SELECT value FROM blueprints WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    payload = bytes(row[0])
+                    self._db.execute("UPDATE blueprints SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self._remember(key, payload)
+                    self.hits += 1
+                    self.disk_hits += 1
+            if payload is None:
+                self.misses += 1
+                return None
+        blueprint = json.loads(payload)
+        blueprint['original_text'] = text
+        return blueprint
+
+    def put(self, text, blueprint):
+        key = self.key_for(text)
+        payload = json.dumps({k: v for k, v in blueprint.items() if k != 'original_text'}, ensure_ascii=False).encode('utf-8', 'surrogatepass')
+        with self._lock:
+            self._remember(key, payload)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO blueprints (key, value, accessed) VALUES (?, ?, ?)", (key, payload, time.time()))
+                self._evict_disk()
+                self._db.commit()
+
+    def _remember(self, key, payload):
+        if len(payload) > self.max_bytes: return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= len(previous)
+        self._entries[key] = payload
+        self.current_bytes += len(payload)
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _evict_disk(self):
+        total = self._db.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM blueprints").fetchone()[0]
+        for key, size in self._db.execute("SELECT key, LENGTH(value) FROM blueprints ORDER BY accessed").fetchall():
+            if total <= self.disk_max_bytes: break
+            self._db.execute("DELETE FROM blueprints WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits,
+                    "evictions": self.evictions, "entries": len(self._entries),
+                    "bytes": self.current_bytes, "max_bytes": self.max_bytes}
+
+
+# --- Analysis Jobs: Bounded Background Queue ---
+class JobQueueFull(Exception):
+    """Raised when an analysis job is submitted while every slot is taken."""
+    def __init__(self, depth, capacity):
+        super().__init__(f"Job queue is full ({depth} of {capacity} slots in use).")
+        self.depth = depth
+        self.capacity = capacity
+
+
+class AnalysisJobs:
+    """Runs analyses on a fixed number of background threads behind a bounded queue.
+
+    `runner(text, progress, cancel)` does the work. Progress is counted in characters
+    completed; cancelling sets the job's event, which the runner checks between
+    characters. Finished jobs are forgotten `ttl` seconds after they end.
+    """
+
+    def __init__(self, runner, workers=2, max_pending=16, ttl=600):
+        self.runner = runner
+        self.capacity = workers + max_pending
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hgi-job")
+
+    def depth(self):
+        """Jobs queued or running."""
+        with self._lock:
+            return self._depth()
+
+    def _depth(self):
+        return sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+
+    def submit(self, text):
+        with self._lock:
+            self._prune()
+            depth = self._depth()
+            if depth >= self.capacity:
+                raise JobQueueFull(depth, self.capacity)
+            job = {'id': uuid.uuid4().hex, 'status': 'queued', 'done': 0, 'total': None,
+                   'result': None, 'error': None, 'finished': None, 'cancel': Event()}
+            self._jobs[job['id']] = job
+            job['future'] = self._executor.submit(self._run, job, text)
+            return self._snapshot(job), depth + 1
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None: return None
+            if job['status'] in ('queued', 'running'):
+                job['cancel'].set()
+                if job['future'].cancel():
+                    self._finish(job, 'cancelled')
+            return self._snapshot(job)
+
+    def _run(self, job, text):
+        with self._lock:
+            if job['cancel'].is_set():
+                # Cancelled after the executor dequeued it, too late for future.cancel().
+                if job['status'] == 'queued': self._finish(job, 'cancelled')
+                return
+            job['status'] = 'running'
+
+        def progress(done, total):
+            job['done'], job['total'] = done, total
+
+        try:
+            result = self.runner(text, progress, job['cancel'])
+        except AnalysisCancelled:
+            with self._lock: self._finish(job, 'cancelled')
+        except Exception as e:
+            with self._lock:
+                job['error'] = str(e)
+                self._finish(job, 'failed')
+        else:
+            with self._lock:
+                job['result'] = result
+                if job['total'] is None:
+                    # Answered without a search (e.g. from the cache): report it as complete.
+                    job['done'] = job['total'] = len(result['codex']) - 1
+                self._finish(job, 'done')
+
+    @staticmethod
+    def _finish(job, status):
+        job['status'] = status
+        job['finished'] = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [k for k, job in self._jobs.items() if job['finished'] and job['finished'] < cutoff]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _snapshot(job):
+        return {'id': job['id'], 'status': job['status'], 'progress': {'done': job['done'], 'total': job['total']},
+                'result': job['result'], 'error': job['error']}
+
+# --- Encoding Sessions: Incremental Re-encoding ---
+class EncodingSessions:
+    """Open incremental sessions by id. Edits to one session run one at a time.
+
+    Opening more than `max_sessions` closes the least recently used one, and
+    sessions idle for `ttl` seconds are closed on the next open.
+    """
+
+    def __init__(self, factory, max_sessions=64, ttl=1800):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def open(self, text):
+        entry = {'id': uuid.uuid4().hex, 'session': self.factory(text), 'lock': Lock(), 'used': time.time()}
+        with self._lock:
+            cutoff = time.time() - self.ttl
+            for session_id in [k for k, old in self._sessions.items() if old['used'] < cutoff]:
+                del self._sessions[session_id]
+            self._sessions[entry['id']] = entry
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return entry
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None: return None
+            entry['used'] = time.time()
+            self._sessions.move_to_end(session_id)
+            return entry
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
 
 # --- HTML/CSS/JS Frontend as a String Variable ---
 HTML_CONTENT = """
@@ -356,12 +595,99 @@ HTML_CONTENT = """
 # --- Flask Server ---
 app = Flask(__name__)
 CORS(app)
+# Size of the persistent search pool shared by all requests; 1 keeps the search in the request thread.
+app.config['SEARCH_WORKERS'] = int(os.environ.get('HGI_SEARCH_WORKERS', '1'))
+# Volumes toured per character, chosen from every factorization of the text's length.
+app.config['MAX_PERMUTATIONS'] = int(os.environ.get('HGI_MAX_PERMUTATIONS', str(HyperGeometrisomorphous.max_permutations)))
+# Finished blueprints, shared by all requests; HGI_CACHE_DIR adds a sqlite tier that survives restarts.
+app.config['BLUEPRINT_CACHE'] = BlueprintCache(
+    max_bytes=int(os.environ.get('HGI_CACHE_BYTES', str(64 * 1024 * 1024))),
+    directory=os.environ.get('HGI_CACHE_DIR') or None,
+    fingerprint=f"codex-v{CODEX_VERSION}:permutations={app.config['MAX_PERMUTATIONS']}")
+# Largest text /reconstitute will rebuild from one codex (or one stream frame), in characters.
+app.config['MAX_DECODE_LENGTH'] = int(os.environ.get('HGI_MAX_DECODE_LENGTH', str(1 << 24)))
+# Bytes of input per independently encoded block on /analyze/stream.
+app.config['STREAM_BLOCK_SIZE'] = int(os.environ.get('HGI_STREAM_BLOCK_SIZE', '16384'))
+# Default search deadline for /analyze in milliseconds; 0 searches to completion.
+app.config['ANALYZE_BUDGET_MS'] = float(os.environ.get('HGI_ANALYZE_BUDGET_MS', '0'))
+# Per-phase engine timings for /metrics; HGI_METRICS=0 turns the engine hooks off.
+app.config['COLLECT_METRICS'] = os.environ.get('HGI_METRICS', '1') != '0'
+app.config['METRICS'] = MetricsRegistry()
+# Background analyses for /jobs: HGI_JOB_WORKERS run at once, HGI_JOB_QUEUE more may wait.
+app.config['ANALYSIS_JOBS'] = AnalysisJobs(
+    lambda text, progress, cancel: run_analysis(text, progress, cancel),
+    workers=int(os.environ.get('HGI_JOB_WORKERS', '2')),
+    max_pending=int(os.environ.get('HGI_JOB_QUEUE', '16')))
+
+# Incremental sessions for /sessions: at most HGI_MAX_SESSIONS stay open, idle ones close after HGI_SESSION_TTL
+# seconds, and each edit re-encodes blocks of at most HGI_SESSION_BLOCK_SIZE characters.
+app.config['ENCODING_SESSIONS'] = EncodingSessions(
+    lambda text: EncodingSession(text, block_size=int(os.environ.get('HGI_SESSION_BLOCK_SIZE', '1024')),
+                                 max_permutations=app.config['MAX_PERMUTATIONS']),
+    max_sessions=int(os.environ.get('HGI_MAX_SESSIONS', '64')),
+    ttl=int(os.environ.get('HGI_SESSION_TTL', '1800')))
 
 @app.route('/')
 def home():
     """Serves the main HTML page."""
     return Response(HTML_CONTENT, mimetype='text/html')
 
+def wants_binary_codex(data):
+    """Binary codices are negotiated by a "format" field, a ?format= parameter, or the Accept header."""
+    requested = data.get('format') or request.args.get('format')
+    if requested:
+        return requested == 'binary'
+    return request.accept_mimetypes.best_match(['application/json', BinaryCodex.MIMETYPE]) == BinaryCodex.MIMETYPE
+
+def run_analysis(text, progress=None, cancel=None, use_cache=True, budget=None):
+    """Answers from the blueprint cache, or runs the search and caches its blueprint.
+
+    With a `budget` in seconds the search stops at the deadline with the best codex so
+    far. Budgeted blueprints depend on how far their search got, so they are never
+    cached; a cached unbudgeted blueprint still answers a budgeted request, reported
+    as a complete search.
+    """
+    # For simplicity, this unified script only runs the Hyper-Geometrisomorphous engine.
+    cache = app.config['BLUEPRINT_CACHE']
+    result = cache.get(text) if use_cache else None
+    if result is not None and budget is not None:
+        characters = len(result['codex']) - 1
+        result['search'] = {'characters': characters, 'searched': characters, 'extended': 0, 'refined': 0,
+                            'budget': budget, 'elapsed': 0.0, 'complete': True, 'cached': True}
+    if result is None:
+        stats = PhaseStats() if app.config['COLLECT_METRICS'] else None
+        engine = HyperGeometrisomorphous(text, max_permutations=app.config['MAX_PERMUTATIONS'], metrics=stats)
+        result = engine.generate_blueprint(workers=app.config['SEARCH_WORKERS'], progress=progress, cancel=cancel, budget=budget)
+        if stats is not None: app.config['METRICS'].observe_analysis(stats)
+        if budget is None: cache.put(text, result)
+    return result
+
+def analysis_budget(data):
+    """Seconds allowed for an /analyze search: a "budget_ms" field or parameter, else HGI_ANALYZE_BUDGET_MS.
+
+    0 asks for a search without a deadline; a negative or non-finite budget raises ValueError.
+    """
+    budget_ms = data.get('budget_ms')
+    if budget_ms is None: budget_ms = request.args.get('budget_ms')
+    if budget_ms is None: budget_ms = app.config['ANALYZE_BUDGET_MS']
+    if isinstance(budget_ms, bool): raise ValueError("budget_ms must be a number.")
+    budget_ms = float(budget_ms)
+    if not math.isfinite(budget_ms) or budget_ms < 0: raise ValueError("budget_ms must be a finite number of at least 0.")
+    return budget_ms / 1000 if budget_ms else None
+
+def profile_analysis(text, limit=25):
+    """Runs an uncached analysis under cProfile; returns the blueprint and the top functions by cumulative time."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = run_analysis(text, use_cache=False)
+    finally:
+        profiler.disable()
+    rows = sorted(pstats.Stats(profiler).stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    top = [{'function': f"{filename}:{line}({name})", 'calls': calls, 'total_time': round(total, 6), 'cumulative_time': round(cumulative, 6)}
+           for (filename, line, name), (_, calls, total, cumulative, _) in rows]
+    return result, top
+
 @app.route('/analyze', methods=['POST'])
 def analyze_route():
     """The analysis endpoint."""
@@ -370,14 +696,204 @@ def analyze_route():
         return jsonify({'error': 'Invalid request. Missing text.'}), 400
     
     text = data['text']
+    try:
+        budget = analysis_budget(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid budget_ms: {str(e)}'}), 400
 
+    started = time.perf_counter()
     try:
-        # For simplicity, this unified script only runs the Hyper-Geometrisomorphous engine.
-        engine = HyperGeometrisomorphous(text)
-        result = engine.generate_blueprint()
+        if request.args.get('profile') == '1':
+            result, top = profile_analysis(text)
+            return jsonify(dict(result, profile=top))
+        result = run_analysis(text, budget=budget)
+        if wants_binary_codex(data):
+            return Response(BinaryCodex.encode(result['codex']), mimetype=BinaryCodex.MIMETYPE)
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': f'An error occurred during analysis: {str(e)}'}), 500
+    finally:
+        app.config['METRICS'].observe_request('/analyze', time.perf_counter() - started)
+
+@app.route('/reconstitute', methods=['POST'])
+def reconstitute_route():
+    """The decoding endpoint: expands a serialized or binary codex back into text."""
+    try:
+        if request.mimetype == BinaryCodex.MIMETYPE:
+            text = BinaryCodex.decode(request.get_data(), app.config['MAX_DECODE_LENGTH'])
+        else:
+            data = request.get_json()
+            if not isinstance(data, dict) or not isinstance(data.get('serialized_codex'), str):
+                return jsonify({'error': 'Invalid request. Missing serialized_codex.'}), 400
+            text = HyperGeometrisomorphousDecoder(data['serialized_codex'], app.config['MAX_DECODE_LENGTH']).decode()
+    except (ValueError, IndexError, OverflowError) as e:
+        return jsonify({'error': f'Malformed codex: {str(e)}'}), 400
+    return jsonify({"engine": "hyper-geometrisomorphous", "text": text, "length": len(text)})
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream_route():
+    """Encodes a raw UTF-8 request body block by block, streaming the container back.
+
+    The first block is read before answering, so a body that is not UTF-8 from the
+    start gets a 400. A later failure cuts the transfer off before its final chunk,
+    and the container it carried lacks its end marker, so clients see it as failed.
+    """
+    encoder = StreamingCodex(block_size=app.config['STREAM_BLOCK_SIZE'], workers=app.config['SEARCH_WORKERS'],
+                             max_permutations=app.config['MAX_PERMUTATIONS'])
+    blocks = encoder.read_blocks(request.stream)
+    try:
+        first = next(blocks, None)
+    except UnicodeDecodeError as e:
+        return jsonify({'error': f'Request body is not valid UTF-8: {str(e)}'}), 400
+    blocks = itertools.chain([] if first is None else [first], blocks)
+    return Response(stream_with_context(encoder.encode_blocks(blocks)), mimetype=StreamingCodex.MIMETYPE)
+
+@app.route('/reconstitute/stream', methods=['POST'])
+def reconstitute_stream_route():
+    """Decodes a streamed container frame by frame, streaming the text back.
+
+    The magic number and the first frame are checked before answering, so a malformed
+    container gets a 400. A frame that fails later cuts the transfer off before its
+    final chunk, so clients see a truncated response rather than a complete one.
+    """
+    try:
+        blocks = StreamingCodex.decode_blocks(request.stream, app.config['MAX_DECODE_LENGTH'])
+        first = next(blocks, None)
+    except (ValueError, IndexError, OverflowError) as e:
+        return jsonify({'error': f'Malformed stream: {str(e)}'}), 400
+    blocks = itertools.chain([] if first is None else [first], blocks)
+    return Response(stream_with_context(block.encode('utf-8', 'surrogatepass') for block in blocks), mimetype='text/plain')
+
+@app.route('/jobs', methods=['POST'])
+def submit_job_route():
+    """Queues an analysis and answers immediately with the job's id."""
+    data = request.get_json()
+    if not data or 'text' not in data:
+        return jsonify({'error': 'Invalid request. Missing text.'}), 400
+
+    jobs = app.config['ANALYSIS_JOBS']
+    try:
+        job, depth = jobs.submit(data['text'])
+    except JobQueueFull as e:
+        response = jsonify({'error': str(e), 'queue_depth': e.depth, 'capacity': e.capacity})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    response = jsonify({'id': job['id'], 'status': job['status'], 'queue_depth': depth, 'capacity': jobs.capacity})
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response, 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status_route(job_id):
+    """Reports a job's progress, and its blueprint once it is done."""
+    job = app.config['ANALYSIS_JOBS'].get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job.'}), 404
+    if job['status'] == 'done' and wants_binary_codex({}):
+        return Response(BinaryCodex.encode(job['result']['codex']), mimetype=BinaryCodex.MIMETYPE)
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job_route(job_id):
+    """Cancels a job; a running search stops before its next character."""
+    job = app.config['ANALYSIS_JOBS'].cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job.'}), 404
+    return jsonify({'id': job['id'], 'status': job['status']}), 202
+
+def session_response(entry, data, status=200, every_block=False):
+    """Re-encodes the blocks an edit touched, answering with their codices (or, asked for a
+    stream, with the whole document's StreamingCodex container)."""
+    session = entry['session']
+    blueprints = session.blueprints()
+    requested = data.get('format') or request.args.get('format')
+    if requested == 'stream' or (not requested and request.accept_mimetypes.best_match(
+            ['application/json', StreamingCodex.MIMETYPE]) == StreamingCodex.MIMETYPE):
+        response = Response(session.container(), mimetype=StreamingCodex.MIMETYPE)
+    else:
+        indices = range(len(blueprints)) if every_block else session.last_update['reencoded']
+        response = jsonify({
+            'engine': 'hyper-geometrisomorphous',
+            'session': dict(session.last_update, id=entry['id'], length=len(session), blocks=len(blueprints)),
+            'blocks': [{'index': i, 'serialized_codex': blueprints[i]['serialized_codex']} for i in indices],
+        })
+    response.status_code = status
+    response.headers['Location'] = f"/sessions/{entry['id']}"
+    return response
+
+@app.route('/sessions', methods=['POST'])
+def open_session_route():
+    """Opens an incremental session over a text and answers with the codex of every block."""
+    data = request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get('text'), str):
+        return jsonify({'error': 'Invalid request. Missing text.'}), 400
+    entry = app.config['ENCODING_SESSIONS'].open(data['text'])
+    with entry['lock']:
+        return session_response(entry, data, 201)
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def session_route(session_id):
+    """The codex of every block of the session's current text."""
+    entry = app.config['ENCODING_SESSIONS'].get(session_id)
+    if entry is None:
+        return jsonify({'error': 'Unknown session.'}), 404
+    with entry['lock']:
+        return session_response(entry, {}, every_block=True)
+
+@app.route('/sessions/<session_id>/append', methods=['POST'])
+def append_session_route(session_id):
+    """Appends text to the session, re-encoding only its last block and any new ones."""
+    data = request.get_json()
+    if not isinstance(data, dict) or not isinstance(data.get('text'), str):
+        return jsonify({'error': 'Invalid request. Missing text.'}), 400
+    entry = app.config['ENCODING_SESSIONS'].get(session_id)
+    if entry is None:
+        return jsonify({'error': 'Unknown session.'}), 404
+    with entry['lock']:
+        entry['session'].append(data['text'])
+        return session_response(entry, data)
+
+@app.route('/sessions/<session_id>/splice', methods=['POST'])
+def splice_session_route(session_id):
+    """Replaces text[start:end] with "text" (empty to delete), re-encoding the blocks it overlaps."""
+    data = request.get_json()
+    if not isinstance(data, dict) or 'start' not in data:
+        return jsonify({'error': 'Invalid request. Missing start.'}), 400
+    if not isinstance(data.get('text', ''), str):
+        return jsonify({'error': 'Invalid request. "text" must be a string.'}), 400
+    entry = app.config['ENCODING_SESSIONS'].get(session_id)
+    if entry is None:
+        return jsonify({'error': 'Unknown session.'}), 404
+    with entry['lock']:
+        try:
+            start = int(data['start'])
+            entry['session'].splice(start, int(data.get('end', start)), data.get('text', ''))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid splice: {str(e)}'}), 400
+        return session_response(entry, data)
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def close_session_route(session_id):
+    """Closes a session and drops its encoded blocks."""
+    if not app.config['ENCODING_SESSIONS'].close(session_id):
+        return jsonify({'error': 'Unknown session.'}), 404
+    return jsonify({'id': session_id, 'status': 'closed'})
+
+@app.route('/cache', methods=['GET'])
+def cache_route():
+    """Reports blueprint cache hit/miss counters and occupancy."""
+    stats = app.config['BLUEPRINT_CACHE'].stats()
+    stats['permutation_memo'] = _volume_permutations.cache_info()._asdict()
+    return jsonify(stats)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    """Prometheus text exposition of engine phase histograms, counters and cache/queue state."""
+    cache = app.config['BLUEPRINT_CACHE'].stats()
+    counters = {f"cache_{name}": cache[name] for name in ('hits', 'misses', 'disk_hits', 'evictions')}
+    gauges = {f"cache_{name}": cache[name] for name in ('entries', 'bytes', 'max_bytes')}
+    gauges['jobs_pending'] = app.config['ANALYSIS_JOBS'].depth()
+    gauges['sessions_open'] = len(app.config['ENCODING_SESSIONS'])
+    return Response(app.config['METRICS'].render(gauges, counters), mimetype='text/plain; version=0.0.4')
 
 def open_browser():
     """Opens the web browser to the server's URL."""
@@ -386,14 +902,19 @@ def open_browser():
 def display_instructions():
     """Displays instructions for running the server."""
     instructions = """
-    This script serves a dual purpose: a web server for the GUI and a command-line tool.
+    This script is the web server for the GUI. The engine itself lives in engine.py,
+    which doubles as a command-line tool and needs neither Flask nor pip.
 
     --- To use the Web Interface ---
-    1. Save this script as a single file (e.g., engine.py).
+    1. Keep this script next to engine.py.
     2. Run this script. It will automatically install dependencies and start the server:
-       python engine.py
+       python engine_server.py
     
     The server will be running at http://localhost:5000. Press CTRL+C to stop it.
+
+    --- To use the Command Line ---
+       python engine.py compress notes.txt -o notes.hgc
+       python engine.py decompress notes.hgc
     """
     print(instructions)
 
@@ -403,8 +924,7 @@ if __name__ == '__main__':
     else:
         print("Starting Hyper-Geometrisomorphous server at http://localhost:5000")
         print("Your browser should open automatically.")
-        print("For usage instructions, run: python engine.py --help")
+        print("For usage instructions, run: python engine_server.py --help")
         print("Press CTRL+C to stop the server.")
         Timer(1, open_browser).start()
         app.run(host='0.0.0.0', port=5000)
-